@@ -1,9 +1,19 @@
 import streamlit as st
+import openpyxl
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import os
+import re
+import shutil
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from urllib.parse import urlsplit
 import json
+import orjson
 import hashlib
+import hmac
 
 # Configure page
 st.set_page_config(
@@ -15,23 +25,33 @@ st.set_page_config(
 # Data storage files
 DATA_FILE = "workbook_data.json"
 AUTH_FILE = "admin_auth.json"
+CACHE_DIR = "workbook_cache"
 
 # Default admin password (you should change this)
 DEFAULT_PASSWORD = "admin123"
 
-def hash_password(password):
-    """Hash password for secure storage"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# Cap on search results - the UI only ever shows a handful of matches,
+# so there is no point materializing 100k result dicts for a generic term
+MAX_RESULTS = 500
 
-def verify_password(password, hashed):
-    """Verify password against hash"""
-    return hash_password(password) == hashed
+def hash_password(password, salt):
+    """Hash password for secure storage (scrypt is memory-hard, so
+    brute-forcing a leaked hash is far more expensive than SHA-256)"""
+    return hashlib.scrypt(password.encode(), salt=salt,
+                          n=2**14, r=8, p=1, dklen=32).hex()
+
+def verify_password(password, salt_hex, hashed):
+    """Verify password against hash in constant time"""
+    computed = hash_password(password, bytes.fromhex(salt_hex))
+    return hmac.compare_digest(computed, hashed)
 
 def init_admin_auth():
     """Initialize admin authentication if not exists"""
     if not os.path.exists(AUTH_FILE):
+        salt = os.urandom(16)
         auth_data = {
-            "password_hash": hash_password(DEFAULT_PASSWORD),
+            "salt": salt.hex(),
+            "password_hash": hash_password(DEFAULT_PASSWORD, salt),
             "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         with open(AUTH_FILE, 'w') as f:
@@ -46,11 +66,20 @@ def authenticate_admin(password):
     if os.path.exists(AUTH_FILE):
         with open(AUTH_FILE, 'r') as f:
             auth_data = json.load(f)
-        return verify_password(password, auth_data['password_hash'])
+        if 'salt' in auth_data:
+            return verify_password(password, auth_data['salt'], auth_data['password_hash'])
+        # Auth file from before salting existed: unsalted SHA-256
+        legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy_hash, auth_data['password_hash'])
     return False
 
+def sheet_cache_path(sheet_idx):
+    """Path of the parquet file backing one sheet"""
+    return os.path.join(CACHE_DIR, f"sheet_{sheet_idx}.parquet")
+
 def save_workbook_data(data):
-    """Save workbook data to JSON file and remove old data"""
+    """Save workbook data to disk (one parquet file per sheet plus JSON
+    metadata) and remove old data"""
     # Remove old workbook file if exists
     if os.path.exists(DATA_FILE):
         try:
@@ -59,84 +88,383 @@ def save_workbook_data(data):
                 st.info(f"🗑️ Removing old workbook: {old_data['filename']}")
         except:
             pass
-    
-    # Save new workbook data
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f)
+    if os.path.exists(CACHE_DIR):
+        shutil.rmtree(CACHE_DIR)
+    os.makedirs(CACHE_DIR)
+
+    # Cell data goes to parquet (dictionary-encoded via category dtype,
+    # since URLs repeat heavily across rows); everything else stays in
+    # the small JSON metadata file
+    meta = {key: value for key, value in data.items() if key != 'sheets'}
+    meta['sheets'] = {}
+    for sheet_idx, (sheet_name, sheet_info) in enumerate(data['sheets'].items()):
+        df = pd.DataFrame({f"c{i}": column
+                           for i, column in enumerate(get_sheet_columns(sheet_info))})
+        df.astype('category').to_parquet(sheet_cache_path(sheet_idx), compression='zstd')
+        meta['sheets'][sheet_name] = {
+            'columns': sheet_info['columns'],
+            'rows': sheet_info['rows'],
+            'cache_path': sheet_cache_path(sheet_idx)
+        }
+
+    # The metadata file still carries the search indexes, which can be
+    # large - orjson serializes them several times faster than stdlib json
+    with open(DATA_FILE, 'wb') as f:
+        f.write(orjson.dumps(meta))
+
+def workbook_mtime():
+    """Modification time of the metadata file, used as a cache key
+    (changes whenever the admin uploads a new workbook)"""
+    return os.path.getmtime(DATA_FILE) if os.path.exists(DATA_FILE) else None
+
+@st.cache_data(show_spinner=False)
+def _load_workbook_cached(path, mtime):
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
 
 def load_workbook_data():
-    """Load workbook data from JSON file"""
+    """Load workbook metadata from JSON file (cell data is read lazily
+    from the per-sheet parquet files via get_sheet_columns).
+
+    Cached across Streamlit reruns; the mtime key invalidates the cache
+    automatically when a new workbook is uploaded.
+    """
     if os.path.exists(DATA_FILE):
         try:
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
+            return _load_workbook_cached(DATA_FILE, workbook_mtime())
         except:
             return None
     return None
 
+def get_workbook():
+    """Workbook dict held in st.session_state so reruns get it with an
+    O(1) lookup and the lazily loaded sheet columns, postings and Arrow
+    arrays survive between interactions (st.cache_data hands back a
+    fresh copy each call, dropping those memoized fields). The mtime
+    check invalidates the entry when the admin uploads a new workbook.
+    """
+    mtime = workbook_mtime()
+    if ('workbook' not in st.session_state
+            or st.session_state.get('workbook_mtime') != mtime):
+        st.session_state['workbook'] = load_workbook_data()
+        st.session_state['workbook_mtime'] = mtime
+    return st.session_state['workbook']
+
+def get_sheet_columns(sheet_info):
+    """Return a sheet's cells as a list of columns, reading the parquet
+    file on first access.
+
+    Column-oriented (SoA) storage means a scan walks one contiguous
+    list per column instead of hopping across per-row list objects, and
+    it matches how parquet lays the data out anyway.
+    """
+    if 'columns_data' not in sheet_info:
+        if 'data' in sheet_info:
+            # Row-major data from a pre-columnar save
+            sheet_info['columns_data'] = [list(col) for col in zip(*sheet_info['data'])]
+        else:
+            df = pd.read_parquet(sheet_info['cache_path'])
+            sheet_info['columns_data'] = [df[col].astype(str).tolist()
+                                          for col in df.columns]
+    return sheet_info['columns_data']
+
+def get_sheet_value_postings(sheet_info):
+    """Map each distinct cell value to its list of (row, col) locations,
+    memoized.
+
+    URL workbooks repeat values heavily, so scanning the distinct set
+    and expanding matches through the postings touches a fraction of
+    the cells (proportional to the dedup ratio).
+    """
+    if 'value_postings' not in sheet_info:
+        postings = defaultdict(list)
+        for col_idx, column in enumerate(get_sheet_columns(sheet_info)):
+            for row_idx, cell_value in enumerate(column):
+                postings[cell_value].append((row_idx, col_idx))
+        sheet_info['value_postings'] = dict(postings)
+    return sheet_info['value_postings']
+
+def get_sheet_distinct_arrow(sheet_info):
+    """The distinct cell values of a sheet as (values list, Arrow string
+    array), memoized, so full scans run pyarrow's SIMD substring kernel
+    over the deduplicated dictionary rather than every cell"""
+    if 'pa_distinct' not in sheet_info:
+        values = list(get_sheet_value_postings(sheet_info))
+        sheet_info['pa_distinct'] = (values, pa.array(values, type=pa.string()))
+    return sheet_info['pa_distinct']
+
+# Tokens are split on whitespace plus the common URL separators, so a cell
+# like "https://example.com/page?id=1" indexes under "https", "example.com",
+# "page", "id" and "1"
+TOKEN_SPLIT_RE = re.compile(r'[\s/:?&=]+')
+
+def tokenize(text):
+    """Split a string into normalized lowercase tokens for indexing"""
+    return [token for token in TOKEN_SPLIT_RE.split(text.lower()) if token]
+
+def url_index_key(url_lower):
+    """Normalize a URL-shaped string to its netloc(+path) index key, or
+    None if it doesn't parse as a URL"""
+    parts = urlsplit(url_lower)
+    if not parts.netloc:
+        return None
+    path = parts.path.rstrip('/')
+    return parts.netloc + path if path else parts.netloc
+
+def build_search_index(sheets):
+    """Build inverted indexes over all sheets so searches avoid a full scan.
+
+    Returns (token_index, exact_index, url_index) where each value is a
+    list of [sheet_name, row_idx, col_idx] locations. url_index keys
+    URL-shaped cells by netloc and netloc+path, so "does this domain
+    appear?" queries are a single dict lookup.
+    """
+    token_index = defaultdict(list)
+    exact_index = defaultdict(list)
+    url_index = defaultdict(list)
+
+    for sheet_name, sheet_info in sheets.items():
+        for col_idx, column in enumerate(get_sheet_columns(sheet_info)):
+            for row_idx, cell_value in enumerate(column):
+                if not cell_value:
+                    continue
+                location = [sheet_name, row_idx, col_idx]
+                cell_lower = cell_value.lower()
+                exact_index[cell_lower].append(location)
+                for token in set(tokenize(cell_value)):
+                    token_index[token].append(location)
+                if '://' in cell_lower:
+                    parts = urlsplit(cell_lower)
+                    if parts.netloc:
+                        url_index[parts.netloc].append(location)
+                        full_key = url_index_key(cell_lower)
+                        if full_key != parts.netloc:
+                            url_index[full_key].append(location)
+
+    return dict(token_index), dict(exact_index), dict(url_index)
+
+def df_to_columns(df):
+    """Convert a DataFrame to a list of columns of strings (vectorized:
+    NaN check and str conversion happen in pandas/NumPy instead of one
+    Python call per cell)"""
+    return df.astype(object).where(df.notna(), "").astype(str).values.T.tolist()
+
+def _convert_sheet(df):
+    """Per-sheet conversion helper (module-level so ProcessPoolExecutor
+    can pickle it)"""
+    return list(df.columns), df_to_columns(df)
+
+def iter_excel_sheets(uploaded_file):
+    """Yield (sheet_name, columns, data) for each sheet of an upload.
+
+    calamine (Rust-based) parses large workbooks several times faster
+    and with far less memory than openpyxl; files it rejects fall back
+    to xlrd for legacy .xls, or to openpyxl in read-only mode, which
+    streams rows instead of materializing the whole sheet (and then a
+    DataFrame copy of it) in memory.
+    """
+    try:
+        excel_data = pd.read_excel(uploaded_file, sheet_name=None, engine='calamine')
+    except Exception:
+        excel_data = None
+
+    if excel_data is None and uploaded_file.name.lower().endswith('.xls'):
+        uploaded_file.seek(0)
+        excel_data = pd.read_excel(uploaded_file, sheet_name=None, engine='xlrd')
+
+    if excel_data is not None:
+        if len(excel_data) > 1:
+            # Sheet conversion is independent per sheet - fan out across
+            # processes to bypass the GIL for the string-heavy work
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+                futures = {sheet_name: pool.submit(_convert_sheet, df)
+                           for sheet_name, df in excel_data.items()}
+                for sheet_name, future in futures.items():
+                    columns, columns_data = future.result()
+                    yield sheet_name, columns, columns_data
+        else:
+            for sheet_name, df in excel_data.items():
+                columns, columns_data = _convert_sheet(df)
+                yield sheet_name, columns, columns_data
+        return
+
+    uploaded_file.seek(0)
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True,
+                                      data_only=True, keep_links=False)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                yield worksheet.title, [], []
+                continue
+            columns = [col if col is not None else f"Unnamed: {i}"
+                       for i, col in enumerate(header)]
+            sheet_rows = [["" if cell is None else str(cell) for cell in row]
+                          for row in rows]
+            columns_data = ([list(col) for col in zip(*sheet_rows)] if sheet_rows
+                            else [[] for _ in columns])
+            yield worksheet.title, columns, columns_data
+    finally:
+        workbook.close()
+
 def process_excel_file(uploaded_file):
     """Process uploaded Excel file and extract all data"""
     try:
-        # Read all sheets
-        excel_data = pd.read_excel(uploaded_file, sheet_name=None, engine='openpyxl')
-        
         workbook_data = {
             'sheets': {},
             'upload_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'filename': uploaded_file.name,
             'file_size': uploaded_file.size
         }
-        
+
         total_rows = 0
-        for sheet_name, df in excel_data.items():
-            # Convert DataFrame to list of lists for easier searching
-            sheet_data = []
-            for idx, row in df.iterrows():
-                row_data = []
-                for col in df.columns:
-                    cell_value = str(row[col]) if pd.notna(row[col]) else ""
-                    row_data.append(cell_value)
-                sheet_data.append(row_data)
-            
+        for sheet_name, columns, columns_data in iter_excel_sheets(uploaded_file):
+            n_rows = len(columns_data[0]) if columns_data else 0
             workbook_data['sheets'][sheet_name] = {
-                'data': sheet_data,
-                'columns': list(df.columns),
-                'rows': len(df)
+                'columns_data': columns_data,
+                'columns': columns,
+                'rows': n_rows
             }
-            total_rows += len(df)
-        
+            total_rows += n_rows
+
         workbook_data['total_rows'] = total_rows
+
+        # Build the inverted indexes once at upload time so every search
+        # afterwards is a dictionary lookup instead of a full workbook scan
+        token_index, exact_index, url_index = build_search_index(workbook_data['sheets'])
+        workbook_data['token_index'] = token_index
+        workbook_data['exact_index'] = exact_index
+        workbook_data['url_index'] = url_index
+
         return workbook_data
         
     except Exception as e:
         st.error(f"Error processing Excel file: {str(e)}")
         return None
 
-def search_link_in_workbook(workbook_data, search_term):
-    """Search for a link/term in the workbook data"""
-    results = []
+def make_result(workbook_data, sheet_name, row_idx, col_idx, search_term_lower):
+    """Build a result dict for one matching cell location"""
+    sheet_info = workbook_data['sheets'][sheet_name]
+    columns = sheet_info['columns']
+    cell_value = str(get_sheet_columns(sheet_info)[col_idx][row_idx])
+    col_name = columns[col_idx] if col_idx < len(columns) else f"Column_{col_idx + 1}"
+    return {
+        'sheet': sheet_name,
+        'row': row_idx + 2,  # +2 because pandas starts from 0 and Excel has header
+        'column': col_name,
+        'cell_value': cell_value,
+        'match_type': 'Exact' if search_term_lower == cell_value.lower() else 'Partial'
+    }
+
+def find_candidate_locations(workbook_data, search_term_lower):
+    """Use the inverted indexes to collect candidate cell locations.
+
+    A query token may be a fragment of an indexed token (e.g. "example"
+    inside "example.com"), so index keys are matched by containment and
+    the postings of each query token are intersected.
+    """
+    token_index = workbook_data['token_index']
+    exact_index = workbook_data['exact_index']
+
+    candidates = None
+    for query_token in tokenize(search_term_lower):
+        postings = set()
+        for token, locations in token_index.items():
+            if query_token in token:
+                postings.update(tuple(loc) for loc in locations)
+        candidates = postings if candidates is None else candidates & postings
+        if not candidates:
+            break
+
+    candidates = candidates or set()
+    candidates.update(tuple(loc) for loc in exact_index.get(search_term_lower, []))
+    return candidates
+
+def search_link_in_workbook(workbook_data, search_term, sheet_names=None,
+                            max_results=MAX_RESULTS):
+    """Search for a link/term in the workbook data.
+
+    Yields result dicts and stops after max_results, so a generic term
+    can't materialize an unbounded number of matches. When sheet_names
+    is given, only those sheets are searched (and only those sheets'
+    parquet files are ever read).
+    """
     search_term_lower = search_term.lower().strip()
-    
+
     if not search_term_lower:
-        return results
-    
-    for sheet_name, sheet_info in workbook_data['sheets'].items():
-        sheet_data = sheet_info['data']
-        columns = sheet_info['columns']
-        
-        for row_idx, row in enumerate(sheet_data):
-            for col_idx, cell_value in enumerate(row):
-                if search_term_lower in str(cell_value).lower():
-                    col_name = columns[col_idx] if col_idx < len(columns) else f"Column_{col_idx + 1}"
-                    results.append({
-                        'sheet': sheet_name,
-                        'row': row_idx + 2,  # +2 because pandas starts from 0 and Excel has header
-                        'column': col_name,
-                        'cell_value': str(cell_value),
-                        'match_type': 'Exact' if search_term_lower == str(cell_value).lower() else 'Partial'
-                    })
-    
-    return results
+        return
+
+    sheets = workbook_data['sheets']
+    if sheet_names is not None:
+        sheets = {name: sheets[name] for name in sheets if name in sheet_names}
+
+    found = 0
+    # Full scan when the workbook predates indexing, or when the term is
+    # made of separator characters only (e.g. "://") - such a term
+    # tokenizes to nothing, so the token index has no constraint to offer
+    if ('token_index' not in workbook_data or 'exact_index' not in workbook_data
+            or not tokenize(search_term_lower)):
+        for sheet_name, sheet_info in sheets.items():
+            values, distinct_arr = get_sheet_distinct_arrow(sheet_info)
+            postings = get_sheet_value_postings(sheet_info)
+            mask = pc.match_substring(distinct_arr, search_term_lower, ignore_case=True)
+            hits = []
+            for value_idx in pc.indices_nonzero(mask).to_pylist():
+                hits.extend(postings[values[value_idx]])
+            for row_idx, col_idx in sorted(hits):
+                yield make_result(workbook_data, sheet_name,
+                                  row_idx, col_idx, search_term_lower)
+                found += 1
+                if found >= max_results:
+                    return
+        return
+
+    # One compiled pattern per query: pattern.search is a single C call
+    # per candidate (with the fast literal-substring path for escaped
+    # needles), instead of a lower() plus an `in` test per cell
+    pattern = re.compile(re.escape(search_term_lower), re.IGNORECASE)
+    sheet_order = {name: i for i, name in enumerate(sheets)}
+
+    # Only the candidate cells from the indexes are verified, never the
+    # whole workbook (the term may span token boundaries, so each
+    # candidate still gets a final substring check)
+    candidates = find_candidate_locations(workbook_data, search_term_lower)
+
+    # URL-shaped queries also pull candidates from the URL index (one
+    # dict lookup per query). It only covers cells that are bare URLs
+    # with the exact domain/path, so it supplements the token candidates
+    # rather than replacing them - cells embedding the URL in text or
+    # extending its path still come from the token index
+    if '://' in search_term_lower:
+        key = url_index_key(search_term_lower)
+        if key:
+            candidates.update(
+                tuple(loc) for loc in workbook_data.get('url_index', {}).get(key, []))
+
+    candidates = {loc for loc in candidates if loc[0] in sheets}
+
+    for sheet_name, row_idx, col_idx in sorted(candidates, key=lambda loc: (sheet_order[loc[0]], loc[1], loc[2])):
+        cell_value = get_sheet_columns(workbook_data['sheets'][sheet_name])[col_idx][row_idx]
+        if pattern.search(cell_value):
+            yield make_result(workbook_data, sheet_name, row_idx, col_idx, search_term_lower)
+            found += 1
+            if found >= max_results:
+                return
+
+@st.cache_data(show_spinner=False)
+def cached_search(mtime, search_term, sheet_names):
+    """Search wrapper cached on (workbook mtime, search term, sheets) so
+    repeat queries against the same workbook skip the search entirely"""
+    return list(search_link_in_workbook(get_workbook(), search_term,
+                                        sheet_names=sheet_names))
+
+@st.cache_data(show_spinner=False)
+def cached_results_csv(mtime, search_term, sheet_names):
+    """CSV bytes for a search's results, cached so reruns don't
+    re-serialize (and re-encode) them on every widget interaction"""
+    results = cached_search(mtime, search_term, sheet_names)
+    return pd.DataFrame(results).to_csv(index=False).encode('utf-8')
 
 def admin_login_form():
     """Display admin login form"""
@@ -172,7 +500,7 @@ def admin_panel():
         st.markdown("Upload your daily workbook file here. **This will automatically replace the existing workbook.**")
     
     # Show current workbook info if exists
-    current_data = load_workbook_data()
+    current_data = get_workbook()
     if current_data:
         st.info(f"📋 **Current workbook:** {current_data['filename']} | "
                 f"**Uploaded:** {current_data['upload_time']} | "
@@ -226,7 +554,8 @@ def admin_panel():
                             'Columns': len(sheet_data['columns'])
                         })
                     
-                    st.dataframe(pd.DataFrame(sheet_info), use_container_width=True)
+                    st.dataframe(pa.Table.from_pylist(sheet_info).to_pandas(),
+                                 use_container_width=True)
                     
                     st.success("🎉 Users can now search in the updated workbook!")
 
@@ -241,7 +570,7 @@ def main():
     tab1, tab2 = st.tabs(["👤 User - Check Links", "🔧 Admin - Upload Workbook"])
     
     # Load existing workbook data
-    workbook_data = load_workbook_data()
+    workbook_data = get_workbook()
     
     with tab1:
         st.header("🔍 Check if Link Exists in Workbook")
@@ -278,12 +607,25 @@ def main():
             placeholder="Paste your link here (e.g., https://example.com)",
             help="Enter any link, URL, or text you want to find in the workbook"
         )
-        
-        if search_term:
+
+        sheet_options = list(workbook_data['sheets'].keys())
+        selected_sheets = st.multiselect(
+            "📑 Sheets to search:",
+            options=sheet_options,
+            default=sheet_options,
+            help="Unselected sheets are skipped entirely, which speeds up searches in large workbooks"
+        )
+
+        if search_term and not selected_sheets:
+            st.info("Select at least one sheet to search.")
+        elif search_term:
             with st.spinner("🔍 Searching in workbook..."):
-                results = search_link_in_workbook(workbook_data, search_term)
+                results = cached_search(workbook_mtime(), search_term, tuple(selected_sheets))
             
             if results:
+                if len(results) >= MAX_RESULTS:
+                    st.warning(f"⚠️ Showing the first {MAX_RESULTS} matches only - "
+                               f"refine your search for a narrower result set.")
                 st.success(f"✅ **Found {len(results)} matches** for your search!")
                 
                 # Display results in a nice format
@@ -300,13 +642,19 @@ def main():
                             st.write("**📄 Cell Content:**")
                             st.code(result['cell_value'], language=None)
                 
-                # Summary table
+                # Summary table (built through Arrow to skip the pandas
+                # type-inference pass, and paginated so huge result sets
+                # don't get fully serialized to the frontend)
                 st.subheader("📊 Search Results Summary")
-                results_df = pd.DataFrame(results)
-                st.dataframe(results_df, use_container_width=True)
+                results_df = pa.Table.from_pylist(results).to_pandas()
+                if len(results_df) > 100 and not st.checkbox("Show all matches"):
+                    st.dataframe(results_df.head(100), use_container_width=True)
+                    st.caption(f"Showing first 100 of {len(results_df)} matches")
+                else:
+                    st.dataframe(results_df, use_container_width=True)
                 
                 # Download results as CSV
-                csv = results_df.to_csv(index=False)
+                csv = cached_results_csv(workbook_mtime(), search_term, tuple(selected_sheets))
                 st.download_button(
                     label="📥 Download Results as CSV",
                     data=csv,